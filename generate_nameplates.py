@@ -5,66 +5,84 @@ This script generates 3MF files that can be directly imported into Bambu Studio
 the base and text already assigned to different extruders (colors).
 """
 
+import contextlib
+import functools
+import hashlib
+import io
+import json
 import os
+import multiprocessing
 import subprocess
+import sys
+import tempfile
+import traceback
 import zipfile
-import xml.etree.ElementTree as ET
+from xml.sax.saxutils import escape
 from pathlib import Path
-from stl import mesh as stl_mesh
 from datetime import datetime
 
-
-class BambuNameplateGenerator:
-    def __init__(self):
-        # Dimensions optimized for 0.2mm layer height printing (25% smaller for bulk printing)
-        self.base_height = 13.5  # mm
-        self.base_thickness = 2.0  # mm
-        self.text_height = 1.2  # mm
-        self.corner_radius = 1.0  # mm
-        self.pin_hole_diameter = 1.0  # mm
-        self.pin_hole_from_edge = 2.0  # mm
-        self.font_size = 9  # points
-        self.min_width = 40  # minimum plate width
-        self.margin = 7  # margin on each side of text
-
-        # Output directories
-        self.output_dir = "output"
-        self.temp_dir = os.path.join(self.output_dir, "temp_generation")
-
-        os.makedirs(self.output_dir, exist_ok=True)
-        os.makedirs(self.temp_dir, exist_ok=True)
-
-    def calculate_text_width(self, text, font_size):
-        """Estimate text width in mm based on character count"""
-        # Use conservative estimate to prevent text overflow
-        char_width = font_size * 0.7
-        return len(text) * char_width
-
-    def calculate_plate_width(self, name):
-        """Calculate appropriate plate width for the given name"""
-        text_width = self.calculate_text_width(name, self.font_size)
-        plate_width = text_width + (2 * self.margin)
-
-        if plate_width < self.min_width:
-            plate_width = self.min_width
-
-        # Round to nearest 5mm
-        plate_width = round(plate_width / 5) * 5
-        return plate_width
-
-    def generate_scad_combined(self, name, output_file):
-        """Generate OpenSCAD file with base and text MERGED as single solid"""
-        plate_width = self.calculate_plate_width(name)
-
-        scad_content = f"""// Combined nameplate for {name} - MERGED geometry
+try:
+    import numpy as np
+except ImportError:
+    # Only the 3MF export needs NumPy; STL generation works without it
+    np = None
+
+try:
+    from PIL import ImageFont
+except ImportError:
+    # Without Pillow, plate widths fall back to a per-character estimate
+    ImageFont = None
+
+
+# Characters that can't appear in output file names, mapped in a single pass
+SAFE_FILENAME_TABLE = str.maketrans({' ': '_', '/': '_'})
+
+# Binary STL facet record: normal, three corners, attribute byte count
+STL_FACET_DTYPE = None if np is None else np.dtype([
+    ('normal', '<f4', (3,)),
+    ('vectors', '<f4', (3, 3)),
+    ('attr', '<u2')
+])
+
+# Font file behind OpenSCAD's "Liberation Sans:style=Bold", used to measure names
+FONT_FILE = "LiberationSans-Bold.ttf"
+MEASURE_FONT_PX = 1000  # load size for measuring; large so advances round finely
+
+
+@functools.lru_cache(maxsize=None)
+def _measure_font():
+    """Load the nameplate font for measuring, or None if it isn't available"""
+    if ImageFont is None:
+        return None
+    try:
+        return ImageFont.truetype(FONT_FILE, MEASURE_FONT_PX)
+    except OSError:
+        return None
+
+
+@functools.lru_cache(maxsize=4096)
+def _text_width_em(text):
+    """Return the kerned advance width of text in em units, or None"""
+    font = _measure_font()
+    if font is None:
+        return None
+    return font.getlength(text) / MEASURE_FONT_PX
+
+
+# OpenSCAD source for one nameplate with base and text MERGED as a single solid.
+# SCAD_TEMPLATE only depends on generator settings and is filled once per
+# generator; SCAD_HEADER carries the per-name values in front of it.
+SCAD_HEADER = """// Combined nameplate for {name} - MERGED geometry
+name = "{scad_name}";
 plate_width = {plate_width};
-plate_height = {self.base_height};
-plate_thickness = {self.base_thickness};
-text_height = {self.text_height};
-corner_radius = {self.corner_radius};
-pin_hole_diameter = {self.pin_hole_diameter};
-pin_hole_from_edge = {self.pin_hole_from_edge};
-font_size = {self.font_size};
+"""
+SCAD_TEMPLATE = """plate_height = {plate_height};
+plate_thickness = {plate_thickness};
+text_height = {text_height};
+corner_radius = {corner_radius};
+pin_hole_diameter = {pin_hole_diameter};
+pin_hole_from_edge = {pin_hole_from_edge};
+font_size = {font_size};
 
 $fn = 64;  // High resolution
 
@@ -88,7 +106,7 @@ module nameplate_base() {{
 module nameplate_text() {{
     translate([0, 0, plate_thickness])
         linear_extrude(height = text_height, convexity = 10)
-            text("{name}", size = font_size, font = "Liberation Sans:style=Bold", halign = "center", valign = "center");
+            text(name, size = font_size, font = "Liberation Sans:style=Bold", halign = "center", valign = "center");
 }}
 
 // UNION base and text into ONE solid mesh - no floating regions!
@@ -97,309 +115,475 @@ union() {{
     nameplate_text();
 }}
 """
-        with open(output_file, 'w') as f:
-            f.write(scad_content)
 
-    def render_stl(self, scad_file, stl_file):
-        """Render SCAD file to STL using OpenSCAD"""
+
+# The 3MF documents below have a fixed structure, so they are written as text
+# templates rather than built node by node; only the name, date and heights
+# vary, and the OPC parts don't vary at all. Values substituted into
+# attributes must escape double quotes too.
+XML_ATTR_ENTITIES = {'"': '&quot;'}
+
+# [Content_Types].xml and _rels/.rels are identical in every 3MF
+CONTENT_TYPES_XML = b"""<?xml version='1.0' encoding='UTF-8'?>
+<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">
+ <Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml" />
+ <Default Extension="model" ContentType="application/vnd.ms-package.3dmanufacturing-3dmodel+xml" />
+</Types>"""
+RELS_XML = b"""<?xml version='1.0' encoding='UTF-8'?>
+<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">
+ <Relationship Target="/3D/3dmodel.model" Id="rel0" Type="http://schemas.microsoft.com/3dmanufacturing/2013/01/3dmodel" />
+</Relationships>"""
+
+# One line per mesh vertex and triangle; _mesh_xml repeats these for a slice
+# of rows at a time and fills each slice with a single bytes % pass
+VERTEX_XML = b'<vertex x="%.4f" y="%.4f" z="%.4f"/>\n'
+TRIANGLE_XML = b'<triangle v1="%d" v2="%d" v3="%d"/>\n'
+MESH_XML_CHUNK_ROWS = 65536  # a few MB of XML per write into the archive
+
+# 3D/3dmodel.model, split around the mesh rendered by _mesh_xml
+MODEL_XML_HEAD = """<?xml version='1.0' encoding='UTF-8'?>
+<model unit="millimeter" xml:lang="en-US" xmlns="http://schemas.microsoft.com/3dmanufacturing/core/2015/02" xmlns:BambuStudio="http://schemas.bambulab.com/package/2021">
+ <metadata name="Application">BambuStudio-02.04.00.70</metadata>
+ <metadata name="BambuStudio:3mfVersion">1</metadata>
+ <metadata name="CreationDate">{date}</metadata>
+ <metadata name="ModificationDate">{date}</metadata>
+ <metadata name="Title">{title}</metadata>
+ <resources>
+  <object id="1" type="model">
+   """
+MODEL_XML_TAIL = b"""
+  </object>
+ </resources>
+ <build>
+  <item objectid="1" printable="1" />
+ </build>
+</model>"""
+
+# Metadata/model_settings.config - paint regions assign the mesh to extruders
+# by height: base (0 to base_top) -> extruder 1, text (base_top to text_top)
+# -> extruder 2
+MODEL_SETTINGS_XML = """<?xml version='1.0' encoding='UTF-8'?>
+<config>
+ <object id="1">
+  <metadata key="name" value="{object_name}" />
+  <part id="1" subtype="normal_part">
+   <metadata key="name" value="{part_name}" />
+   <metadata key="matrix" value="1 0 0 0 0 1 0 0 0 0 1 0 0 0 0 1" />
+   <paint>
+    <metadata key="extruder" value="1" />
+    <metadata key="height_range_low" value="0" />
+    <metadata key="height_range_high" value="{base_top}" />
+   </paint>
+   <paint>
+    <metadata key="extruder" value="2" />
+    <metadata key="height_range_low" value="{base_top}" />
+    <metadata key="height_range_high" value="{text_top}" />
+   </paint>
+  </part>
+ </object>
+ <plate>
+  <metadata key="plater_id" value="1" />
+  <model_instance>
+   <metadata key="object_id" value="1" />
+   <metadata key="instance_id" value="0" />
+  </model_instance>
+ </plate>
+ <assemble>
+  <assemble_item object_id="1" instance_id="0" transform="1 0 0 0 1 0 0 0 1 0 0 0" offset="0 0 0" />
+ </assemble>
+</config>"""
+
+
+class BambuNameplateGenerator:
+    def __init__(self):
+        # Dimensions optimized for 0.2mm layer height printing (25% smaller for bulk printing)
+        self.base_height = 13.5  # mm
+        self.base_thickness = 2.0  # mm
+        self.text_height = 1.2  # mm
+        self.corner_radius = 1.0  # mm
+        self.pin_hole_diameter = 1.0  # mm
+        self.pin_hole_from_edge = 2.0  # mm
+        self.font_size = 9  # points
+        self.min_width = 40  # minimum plate width
+        self.margin = 7  # margin on each side of text
+
+        # 3MF mesh deflate level: 1 is fastest, 9 gives the smallest files
+        self.zip_compresslevel = 1
+        # Creation date stamped into every 3MF from this generator
+        self._today = datetime.now().strftime('%Y-%m-%d')
+
+        # Output directory - created once here; nothing downstream needs to
+        # re-check it. SCAD sources go to per-render temporary directories.
+        self.output_dir = Path("output")
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+
+        # OpenSCAD geometry backend arguments, probed on first render
+        self._backend_args = None
+
+        # STL file name -> render key of the settings it was generated with
+        self.render_cache_file = self.output_dir / ".render_cache.json"
+        self._render_cache = {}
+
+        # Everything in the SCAD source except the name and width is fixed
+        # per generator, so specialize the template once up front
+        self._scad_body = SCAD_TEMPLATE.format_map({
+            'plate_height': self.base_height,
+            'plate_thickness': self.base_thickness,
+            'text_height': self.text_height,
+            'corner_radius': self.corner_radius,
+            'pin_hole_diameter': self.pin_hole_diameter,
+            'pin_hole_from_edge': self.pin_hole_from_edge,
+            'font_size': self.font_size
+        })
+
+    def calculate_text_width(self, text, font_size):
+        """Measure text width in mm from the font's glyph advances"""
+        em_width = _text_width_em(text)
+        if em_width is not None:
+            # OpenSCAD's text(size=s) lays glyphs out on an em of s / 0.72 mm
+            return em_width * font_size / 0.72
+
+        # Font unavailable: use conservative estimate to prevent text overflow
+        char_width = font_size * 0.7
+        return len(text) * char_width
+
+    def calculate_plate_width(self, name):
+        """Calculate appropriate plate width for the given name"""
+        text_width = self.calculate_text_width(name, self.font_size)
+        plate_width = text_width + (2 * self.margin)
+
+        if plate_width < self.min_width:
+            plate_width = self.min_width
+
+        # Round to nearest 5mm
+        plate_width = round(plate_width / 5) * 5
+        return plate_width
+
+    def generate_scad_combined(self, name, output_file, plate_width=None):
+        """Generate OpenSCAD file with base and text MERGED as single solid"""
+        if plate_width is None:
+            plate_width = self.calculate_plate_width(name)
+
+        header = SCAD_HEADER.format(
+            name=name,
+            # Escape for an OpenSCAD string literal so quotes can't break the file
+            scad_name=name.replace('\\', '\\\\').replace('"', '\\"'),
+            plate_width=plate_width
+        )
+        Path(output_file).write_text(header + self._scad_body)
+
+    def openscad_backend_args(self):
+        """Return the OpenSCAD arguments selecting the Manifold backend, if supported"""
+        if self._backend_args is None:
+            try:
+                result = subprocess.run(
+                    ['openscad', '--help'],
+                    capture_output=True,
+                    text=True,
+                    timeout=30
+                )
+                help_text = (result.stdout + result.stderr).lower()
+            except Exception:
+                help_text = ''
+
+            # Manifold is orders of magnitude faster than CGAL for our CSG.
+            # Newer builds select it with --backend, older snapshots ship it
+            # as an experimental feature, and releases without it use CGAL.
+            if '--backend' in help_text:
+                backend_args = ['--backend=manifold']
+            elif 'manifold' in help_text:
+                backend_args = ['--enable=manifold']
+            else:
+                backend_args = []
+
+            # Some builds advertise Manifold but reject the flag. Settle that
+            # here with a trivial render, before generate_batch ships the
+            # result to workers, instead of finding out again for every name.
+            if backend_args and not self._backend_renders(backend_args):
+                backend_args = []
+            self._backend_args = backend_args
+        return self._backend_args
+
+    def _backend_renders(self, backend_args):
+        """Check that openscad can render a trivial model with backend_args"""
         try:
+            with tempfile.TemporaryDirectory(prefix="nameplate_") as probe_dir:
+                probe_scad = Path(probe_dir) / "probe.scad"
+                probe_scad.write_text("cube(1);\n")
+                result = subprocess.run(
+                    ['openscad', *backend_args, '--export-format=binstl',
+                     '-o', Path(probe_dir) / "probe.stl", probe_scad],
+                    capture_output=True,
+                    timeout=30
+                )
+            return result.returncode == 0
+        except Exception:
+            return False
+
+    def _run_openscad(self, args):
+        """Run openscad on the preferred backend, retrying on its default one"""
+        backend_args = self.openscad_backend_args()
+        result = subprocess.run(
+            ['openscad', *backend_args, *args],
+            capture_output=True,
+            timeout=60
+        )
+        # Only retry when OpenSCAD complained about the backend option itself
+        # (e.g. "unrecognised option '--backend=manifold'"); a SCAD or font
+        # error would just fail the same way a second time on CGAL
+        option = backend_args[0].split('=')[0].encode() if backend_args else None
+        if result.returncode != 0 and option and option in result.stderr:
             result = subprocess.run(
-                ['openscad', '-o', stl_file, scad_file],
+                ['openscad', *args],
                 capture_output=True,
-                text=True,
                 timeout=60
             )
-            return result.returncode == 0
+            if result.returncode == 0:
+                self._backend_args = []
+        return result
+
+    def render_stl(self, scad_file, stl_file):
+        """Render SCAD file to binary STL using OpenSCAD"""
+        # Render into a file only this process touches and move it into place
+        # once complete, so a failed or concurrent render never leaves a
+        # partial STL at the output path
+        stl_file = Path(stl_file)
+        private_stl = stl_file.with_name(f"{stl_file.name}.{os.getpid()}.tmp")
+        try:
+            # Binary STL is ~4x smaller than OpenSCAD's default ASCII output
+            # and loads without text parsing
+            result = self._run_openscad(['--export-format=binstl', '-o', private_stl, scad_file])
+            if result.returncode != 0:
+                return False
+            os.replace(private_stl, stl_file)
+            return True
         except Exception as e:
             print(f"  Error rendering {scad_file}: {e}")
             return False
+        finally:
+            private_stl.unlink(missing_ok=True)
+
+    def render_stl_bytes(self, scad_file):
+        """Render SCAD file with OpenSCAD and return binary STL bytes (None on failure)"""
+        try:
+            result = self._run_openscad(['--export-format=binstl', '-o', '-', scad_file])
+        except Exception as e:
+            print(f"  Error rendering {scad_file}: {e}")
+            return None
+        return result.stdout if result.returncode == 0 else None
 
     def create_bambu_3mf(self, combined_stl, output_3mf, name):
         """
         Create a Bambu Labs compatible 3MF file with merged mesh and painted regions.
         Uses single STL to avoid floating regions, with color painting by Z-height.
+        combined_stl is either an STL file path or STL bytes from render_stl_bytes.
         """
-        try:
-            # Load the single merged STL
-            mesh = stl_mesh.Mesh.from_file(combined_stl)
-
-            # Create temporary 3MF structure
-            temp_3mf_dir = os.path.join(self.temp_dir, "3mf_structure")
-            if os.path.exists(temp_3mf_dir):
-                import shutil
-                shutil.rmtree(temp_3mf_dir)
-
-            os.makedirs(temp_3mf_dir, exist_ok=True)
-            model_dir = os.path.join(temp_3mf_dir, "3D")
-            metadata_dir = os.path.join(temp_3mf_dir, "Metadata")
-            os.makedirs(model_dir, exist_ok=True)
-            os.makedirs(metadata_dir, exist_ok=True)
-
-            # Create 3dmodel.model file with single mesh
-            self._create_model_file(mesh, model_dir, name)
-
-            # Create model_settings.config (this is where color assignment happens!)
-            self._create_model_settings(metadata_dir, name)
-
-            # Create [Content_Types].xml
-            self._create_content_types(temp_3mf_dir)
-
-            # Create _rels/.rels (required for 3MF to be recognized!)
-            self._create_rels(temp_3mf_dir)
-
-            # Create ZIP (3MF file)
-            with zipfile.ZipFile(output_3mf, 'w', zipfile.ZIP_DEFLATED) as zipf:
-                for root, dirs, files in os.walk(temp_3mf_dir):
-                    for file in files:
-                        file_path = os.path.join(root, file)
-                        arcname = os.path.relpath(file_path, temp_3mf_dir)
-                        zipf.write(file_path, arcname)
+        if np is None:
+            print("  Error creating 3MF: NumPy is required (pip install numpy)")
+            return False
 
-            # Clean up
-            import shutil
-            shutil.rmtree(temp_3mf_dir)
+        # The mesh is generated while the archive is open, so build it under
+        # a temporary name and only move it into place once it is complete
+        partial_3mf = Path(f"{output_3mf}.tmp")
+        try:
+            # Load the single merged STL, straight from memory when possible
+            if isinstance(combined_stl, bytes):
+                vectors = self.parse_stl_vectors(combined_stl)
+            else:
+                vectors = self.load_stl_vectors(combined_stl)
+
+            # Write the archive in one pass, streaming each part in chunks so
+            # the mesh XML never has to exist in memory all at once. The mesh
+            # is highly repetitive text, so even fast deflate gets nearly the
+            # full ratio; the metadata parts are a few hundred bytes and not
+            # worth compressing at all.
+            parts = [
+                ('[Content_Types].xml', [self._create_content_types()], zipfile.ZIP_STORED),
+                # Required for 3MF to be recognized!
+                ('_rels/.rels', [self._create_rels()], zipfile.ZIP_STORED),
+                ('3D/3dmodel.model', self._create_model_file(vectors, name), zipfile.ZIP_DEFLATED),
+                # This is where color assignment happens!
+                ('Metadata/model_settings.config', [self._create_model_settings(name)], zipfile.ZIP_STORED)
+            ]
+            with zipfile.ZipFile(partial_3mf, 'w') as zipf:
+                for arcname, chunks, compress_type in parts:
+                    # Fixed member timestamps keep archives reproducible and
+                    # skip a clock lookup per member
+                    zinfo = zipfile.ZipInfo(arcname, date_time=(1980, 1, 1, 0, 0, 0))
+                    zinfo.external_attr = 0o644 << 16
+                    zinfo.compress_type = compress_type
+                    if compress_type == zipfile.ZIP_DEFLATED:
+                        # ZipFile.open() takes the level from the ZipInfo
+                        # only, via the private _compresslevel (3.7-3.12;
+                        # 3.13 renamed it compress_level, keeping the alias)
+                        zinfo._compresslevel = self.zip_compresslevel
+                    with zipf.open(zinfo, 'w') as entry:
+                        for chunk in chunks:
+                            entry.write(chunk)
+            os.replace(partial_3mf, output_3mf)
 
             return True
         except Exception as e:
+            partial_3mf.unlink(missing_ok=True)
             print(f"  Error creating 3MF: {e}")
-            import traceback
             traceback.print_exc()
             return False
 
-    def _create_model_file(self, mesh, model_dir, name):
-        """Create the 3D/3dmodel.model file with single merged mesh"""
-        model_root = ET.Element('model', {
-            'unit': 'millimeter',
-            'xml:lang': 'en-US',
-            'xmlns': 'http://schemas.microsoft.com/3dmanufacturing/core/2015/02',
-            'xmlns:BambuStudio': 'http://schemas.bambulab.com/package/2021'
-        })
-
-        # Add metadata
-        metadata_items = [
-            ('Application', 'BambuStudio-02.04.00.70'),
-            ('BambuStudio:3mfVersion', '1'),
-            ('CreationDate', datetime.now().strftime('%Y-%m-%d')),
-            ('ModificationDate', datetime.now().strftime('%Y-%m-%d')),
-            ('Title', name)
+    def load_stl_vectors(self, stl_file):
+        """Load an STL file as an (N, 3, 3) array of triangle corners"""
+        return self.parse_stl_vectors(Path(stl_file).read_bytes())
+
+    def parse_stl_vectors(self, data):
+        """Parse STL bytes into an (N, 3, 3) array of triangle corners"""
+        # Binary STL: 80-byte header, uint32 facet count, fixed-size records
+        if len(data) >= 84:
+            count = int(np.frombuffer(data, '<u4', count=1, offset=80)[0])
+            if len(data) == 84 + count * STL_FACET_DTYPE.itemsize:
+                return np.frombuffer(data, STL_FACET_DTYPE, count=count, offset=84)['vectors']
+
+        # ASCII STL: three "vertex x y z" lines per facet
+        coords = [
+            line.split()[1:4]
+            for line in data.decode('ascii').splitlines()
+            if line.lstrip().startswith('vertex')
         ]
+        return np.array(coords, dtype=np.float32).reshape(-1, 3, 3)
 
-        for key, value in metadata_items:
-            meta = ET.SubElement(model_root, 'metadata', {'name': key})
-            meta.text = value
-
-        resources = ET.SubElement(model_root, 'resources')
-
-        # Single object with merged geometry
-        obj = ET.SubElement(resources, 'object', {
-            'id': '1',
-            'type': 'model'
-        })
-        self._add_mesh_to_object(obj, mesh)
-
-        # Build plate
-        build = ET.SubElement(model_root, 'build')
-        ET.SubElement(build, 'item', {
-            'objectid': '1',
-            'printable': '1'
-        })
-
-        # Write file
-        tree = ET.ElementTree(model_root)
-        ET.indent(tree, space=' ')
-        model_file = os.path.join(model_dir, '3dmodel.model')
-        tree.write(model_file, encoding='UTF-8', xml_declaration=True)
-
-    def _add_mesh_to_object(self, obj_element, mesh):
-        """Add mesh vertices and triangles to an object element"""
-        mesh_elem = ET.SubElement(obj_element, 'mesh')
-        vertices_elem = ET.SubElement(mesh_elem, 'vertices')
-        triangles_elem = ET.SubElement(mesh_elem, 'triangles')
-
-        vertex_idx = 0
-        for triangle in mesh.vectors:
-            for vertex in triangle:
-                ET.SubElement(vertices_elem, 'vertex', {
-                    'x': str(vertex[0]),
-                    'y': str(vertex[1]),
-                    'z': str(vertex[2])
-                })
-            ET.SubElement(triangles_elem, 'triangle', {
-                'v1': str(vertex_idx),
-                'v2': str(vertex_idx + 1),
-                'v3': str(vertex_idx + 2)
-            })
-            vertex_idx += 3
-
-    def _create_model_settings(self, metadata_dir, name):
+    def _create_model_file(self, vectors, name):
+        """Yield the 3D/3dmodel.model part with single merged mesh, in chunks"""
+        head = MODEL_XML_HEAD.format(
+            date=self._today,
+            title=escape(name)
+        )
+        yield head.encode('UTF-8')
+        yield from self._mesh_xml(vectors)
+        yield MODEL_XML_TAIL
+
+    def _mesh_xml(self, vectors):
+        """Render an (N, 3, 3) triangle array as UTF-8 3MF <mesh> element chunks"""
+        # STL repeats every shared corner once per triangle, but 3MF meshes
+        # are indexed: emit each distinct corner once and point the triangles
+        # at it. Comparing corners as raw 12-byte keys keeps this exact.
+        corners = np.ascontiguousarray(vectors, dtype=np.float32).reshape(-1, 3)
+        keys = corners.view(np.dtype((np.void, corners.itemsize * 3))).ravel()
+        unique_keys, corner_index = np.unique(keys, return_inverse=True)
+        unique_corners = unique_keys.view(np.float32).reshape(-1, 3)
+
+        # Format each slice of rows in one C-level bytes pass instead of
+        # building an Element per vertex and triangle; 0.1um (4 decimals) is
+        # far below print resolution and keeps the XML compact.
+        triangle_corners = corner_index.reshape(-1, 3)
+        yield b'<mesh>\n<vertices>\n'
+        for start in range(0, len(unique_corners), MESH_XML_CHUNK_ROWS):
+            rows = unique_corners[start:start + MESH_XML_CHUNK_ROWS]
+            yield (VERTEX_XML * len(rows)) % tuple(rows.reshape(-1).tolist())
+        yield b'</vertices>\n<triangles>\n'
+        for start in range(0, len(triangle_corners), MESH_XML_CHUNK_ROWS):
+            rows = triangle_corners[start:start + MESH_XML_CHUNK_ROWS]
+            yield (TRIANGLE_XML * len(rows)) % tuple(rows.reshape(-1).tolist())
+        yield b'</triangles>\n</mesh>'
+
+    def _create_model_settings(self, name):
         """
-        Create model_settings.config with painted regions for multi-color.
+        Create model_settings.config part with painted regions for multi-color.
         Single mesh with facets painted by Z-height.
         """
-        config_root = ET.Element('config')
-
-        # Object definition
-        obj = ET.SubElement(config_root, 'object', {'id': '1'})
-        ET.SubElement(obj, 'metadata', {
-            'key': 'name',
-            'value': f'{name}.3mf'
-        })
-
-        # Single part representing the whole model
-        part = ET.SubElement(obj, 'part', {
-            'id': '1',
-            'subtype': 'normal_part'
-        })
-        ET.SubElement(part, 'metadata', {
-            'key': 'name',
-            'value': name
-        })
-        ET.SubElement(part, 'metadata', {
-            'key': 'matrix',
-            'value': '1 0 0 0 0 1 0 0 0 0 1 0 0 0 0 1'
-        })
-
-        # Paint metadata - assign regions by height to different extruders
-        # Base region (0 to base_thickness) -> extruder 1
-        paint1 = ET.SubElement(part, 'paint')
-        ET.SubElement(paint1, 'metadata', {
-            'key': 'extruder',
-            'value': '1'
-        })
-        ET.SubElement(paint1, 'metadata', {
-            'key': 'height_range_low',
-            'value': '0'
-        })
-        ET.SubElement(paint1, 'metadata', {
-            'key': 'height_range_high',
-            'value': str(self.base_thickness)
-        })
-
-        # Text region (base_thickness to base_thickness + text_height) -> extruder 2
-        paint2 = ET.SubElement(part, 'paint')
-        ET.SubElement(paint2, 'metadata', {
-            'key': 'extruder',
-            'value': '2'
-        })
-        ET.SubElement(paint2, 'metadata', {
-            'key': 'height_range_low',
-            'value': str(self.base_thickness)
-        })
-        ET.SubElement(paint2, 'metadata', {
-            'key': 'height_range_high',
-            'value': str(self.base_thickness + self.text_height)
-        })
-
-        # Plate info
-        plate = ET.SubElement(config_root, 'plate')
-        ET.SubElement(plate, 'metadata', {
-            'key': 'plater_id',
-            'value': '1'
-        })
-
-        # Model instance
-        model_inst = ET.SubElement(plate, 'model_instance')
-        ET.SubElement(model_inst, 'metadata', {
-            'key': 'object_id',
-            'value': '1'
-        })
-        ET.SubElement(model_inst, 'metadata', {
-            'key': 'instance_id',
-            'value': '0'
-        })
-
-        # Assemble section
-        assemble = ET.SubElement(config_root, 'assemble')
-        ET.SubElement(assemble, 'assemble_item', {
-            'object_id': '1',
-            'instance_id': '0',
-            'transform': '1 0 0 0 1 0 0 0 1 0 0 0',
-            'offset': '0 0 0'
-        })
-
-        # Write file
-        tree = ET.ElementTree(config_root)
-        ET.indent(tree, space=' ')
-        config_file = os.path.join(metadata_dir, 'model_settings.config')
-        tree.write(config_file, encoding='UTF-8', xml_declaration=True)
-
-    def _create_content_types(self, temp_3mf_dir):
-        """Create [Content_Types].xml"""
-        types_root = ET.Element('Types', {
-            'xmlns': 'http://schemas.openxmlformats.org/package/2006/content-types'
-        })
-
-        ET.SubElement(types_root, 'Default', {
-            'Extension': 'rels',
-            'ContentType': 'application/vnd.openxmlformats-package.relationships+xml'
-        })
-        ET.SubElement(types_root, 'Default', {
-            'Extension': 'model',
-            'ContentType': 'application/vnd.ms-package.3dmanufacturing-3dmodel+xml'
-        })
-
-        tree = ET.ElementTree(types_root)
-        ET.indent(tree, space=' ')
-        tree.write(
-            os.path.join(temp_3mf_dir, '[Content_Types].xml'),
-            encoding='UTF-8',
-            xml_declaration=True
+        settings = MODEL_SETTINGS_XML.format(
+            object_name=escape(f'{name}.3mf', XML_ATTR_ENTITIES),
+            part_name=escape(name, XML_ATTR_ENTITIES),
+            base_top=self.base_thickness,
+            text_top=self.base_thickness + self.text_height
         )
+        return settings.encode('UTF-8')
+
+    def _create_content_types(self):
+        """Create [Content_Types].xml part"""
+        return CONTENT_TYPES_XML
+
+    def _create_rels(self):
+        """Create _rels/.rels part (required for 3MF validation)"""
+        return RELS_XML
+
+    def safe_filename(self, name):
+        """Return the file name stem used for a nameplate's output files"""
+        return name.translate(SAFE_FILENAME_TABLE)
+
+    def render_key(self, name):
+        """Hash the name together with everything that shapes its geometry"""
+        # The specialized SCAD body already embeds every dimension setting
+        params = (
+            name,
+            self.calculate_plate_width(name),
+            SCAD_HEADER,
+            self._scad_body
+        )
+        return hashlib.blake2b(repr(params).encode(), digest_size=16).hexdigest()
 
-    def _create_rels(self, temp_3mf_dir):
-        """Create _rels/.rels file (required for 3MF validation)"""
-        rels_dir = os.path.join(temp_3mf_dir, '_rels')
-        os.makedirs(rels_dir, exist_ok=True)
-
-        rels_root = ET.Element('Relationships', {
-            'xmlns': 'http://schemas.openxmlformats.org/package/2006/relationships'
-        })
-
-        ET.SubElement(rels_root, 'Relationship', {
-            'Target': '/3D/3dmodel.model',
-            'Id': 'rel0',
-            'Type': 'http://schemas.microsoft.com/3dmanufacturing/2013/01/3dmodel'
-        })
-
-        tree = ET.ElementTree(rels_root)
-        ET.indent(tree, space=' ')
-        tree.write(
-            os.path.join(rels_dir, '.rels'),
-            encoding='UTF-8',
-            xml_declaration=True
+    def load_render_cache(self):
+        """Load the render keys recorded by the previous run, if any"""
+        try:
+            self._render_cache = json.loads(self.render_cache_file.read_text())
+        except (OSError, ValueError):
+            self._render_cache = {}
+
+    def save_render_cache(self):
+        """Persist the render keys so unchanged names are skipped next run"""
+        self.render_cache_file.write_text(
+            json.dumps(self._render_cache, indent=1, sort_keys=True)
         )
 
     def generate_nameplate(self, name):
         """Generate a complete nameplate 3MF file ready for Bambu Studio"""
-        safe_name = name.replace(" ", "_").replace("/", "_")
+        safe_name = self.safe_filename(name)
 
         print(f"\n{'='*60}")
         print(f"Generating: {name}")
         print(f"{'='*60}")
 
         # File paths
-        scad_file = os.path.join(self.temp_dir, f"{safe_name}.scad")
-        stl_file = os.path.join(self.output_dir, f"{safe_name}.stl")
+        stl_file = self.output_dir / f"{safe_name}.stl"
 
         # Calculate dimensions
         plate_width = self.calculate_plate_width(name)
         print(f"  Plate dimensions: {plate_width}mm x {self.base_height}mm")
 
-        # Generate single merged SCAD file
-        print(f"  Generating OpenSCAD file...")
-        self.generate_scad_combined(name, scad_file)
+        # Skip names whose STL was already rendered with identical settings
+        cache_entry = self._render_cache.get(f"{safe_name}.stl")
+        if cache_entry == self.render_key(name) and stl_file.exists():
+            print(f"  ✓ Up to date, skipping render: {safe_name}.stl")
+            return True
 
-        # Render to STL - single solid piece
-        print(f"  Rendering to STL...")
-        if not self.render_stl(scad_file, stl_file):
-            print(f"  Failed to render STL")
-            return False
+        # The SCAD source is only an input to OpenSCAD, so keep it in a private
+        # temporary directory on $TMPDIR, removed as soon as the render ends.
+        # The STL output is shared by stem: render_stl renders it privately
+        # and generate_batch refuses names whose stems collide.
+        with tempfile.TemporaryDirectory(prefix="nameplate_") as scad_dir:
+            scad_file = Path(scad_dir) / f"{safe_name}.scad"
+
+            # Generate single merged SCAD file
+            print(f"  Generating OpenSCAD file...")
+            self.generate_scad_combined(name, scad_file, plate_width)
+
+            # Render to STL - single solid piece
+            print(f"  Rendering to STL...")
+            if not self.render_stl(scad_file, stl_file):
+                print(f"  Failed to render STL")
+                return False
 
         print(f"  ✓ Success! Created: {safe_name}.stl")
         print(f"    Single solid piece - no floating regions, all letters complete")
 
         return True
 
+    def _generate_one(self, name):
+        """Pool worker: generate a single nameplate and report the outcome"""
+        # Workers run side by side, so collect this name's progress and let
+        # the parent print it as one block instead of interleaving lines
+        log = io.StringIO()
+        with contextlib.redirect_stdout(log):
+            success = self.generate_nameplate(name)
+        return {'name': name, 'success': success, 'log': log.getvalue()}
+
     def generate_batch(self, names):
         """Generate nameplates for multiple names"""
         print(f"\n{'#'*60}")
@@ -408,18 +592,58 @@ union() {{
         print(f"# Single-color STL files - no floating regions!")
         print(f"{'#'*60}")
 
-        results = []
-        for name in names:
-            success = self.generate_nameplate(name)
-            results.append({'name': name, 'success': success})
+        # A name listed twice would only render the same STL twice
+        unique_names = list(dict.fromkeys(names))
+
+        # Names that map to the same file stem (e.g. "A B" and "A_B") would
+        # race for one STL that no single name could be credited with, so
+        # refuse the whole group instead of shipping whichever finished last
+        by_stem = {}
+        for name in unique_names:
+            by_stem.setdefault(self.safe_filename(name), []).append(name)
+        by_name = {}
+        for stem, group in by_stem.items():
+            if len(group) > 1:
+                clashing = ", ".join(repr(name) for name in group)
+                print(f"\nError: {clashing} would all be written to {stem}.stl; rename all but one")
+                by_name.update((name, {'name': name, 'success': False}) for name in group)
+        to_render = [name for name in unique_names if name not in by_name]
+
+        self.load_render_cache()
+        # Probe the OpenSCAD backend once up front so the result ships to
+        # every worker instead of each task re-running `openscad --help`
+        self.openscad_backend_args()
+
+        # Every nameplate is independent and bound by its OpenSCAD render, so
+        # fan the names out across one worker process per core. Longer names
+        # mean bigger plates and slower renders; starting those first keeps a
+        # long name from being the lone straggler at the end of the batch.
+        processes = max(1, min(len(to_render), os.cpu_count() or 1))
+        longest_first = sorted(to_render, key=len, reverse=True)
+        with multiprocessing.Pool(processes=processes) as pool:
+            for r in pool.imap_unordered(self._generate_one, longest_first):
+                # Report each name as soon as its worker finishes
+                print(r.pop('log'), end='', flush=True)
+                by_name[r['name']] = r
+        unique_results = [by_name[name] for name in unique_names]
+
+        # Workers only see a copy of the cache, so record new renders here;
+        # a clashing stem is dropped, as its STL can't be attributed
+        for r in unique_results:
+            stl_name = f"{self.safe_filename(r['name'])}.stl"
+            if r['success']:
+                self._render_cache[stl_name] = self.render_key(r['name'])
+            else:
+                self._render_cache.pop(stl_name, None)
+        self.save_render_cache()
 
         # Summary
         print(f"\n{'='*60}")
         print(f"GENERATION COMPLETE")
         print(f"{'='*60}")
 
-        successful = [r for r in results if r['success']]
-        failed = [r for r in results if not r['success']]
+        successful = [r for r in unique_results if r['success']]
+        failed = [r for r in unique_results if not r['success']]
 
         if successful:
             print(f"\nSuccessfully generated {len(successful)} nameplate(s):")
@@ -438,13 +662,12 @@ union() {{
         print(f"Import them into Bambu Studio and slice!")
         print(f"\nSingle-color solid pieces - no floating regions, all letters complete!")
 
-        return results
+        # One result per input name, in input order
+        return [by_name[name] for name in names]
 
 
 def main():
     """Main entry point"""
-    import sys
-
     generator = BambuNameplateGenerator()
 
     # Read names from file